@@ -2,19 +2,61 @@
 """
 Q&A Evaluation Script
 Tests the RAG system against a curated set of questions
+
+Keyword matching uses pyahocorasick when it is installed (optional) and
+falls back to substring checks otherwise.
 """
 
-import json
+import io
+import re
 import requests
 import sys
-from typing import List, Dict
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+import orjson
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
 
 API_BASE_URL = "http://localhost:8000"
+EVAL_SET_PATH = "eval/qa_eval_set.json"
+
+# Pooled keep-alive session shared by every call to the API
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+SESSION.headers.update({"Connection": "keep-alive"})
+
+MAX_WORKERS = 8
+ASK_TIMEOUT = 60
+
+# Consecutive /ask failures after which the remaining questions are skipped
+MAX_CONSECUTIVE_FAILURES = 3
 
-def load_eval_set(filepath: str = "eval/qa_eval_set.json") -> List[Dict]:
-    """Load evaluation questions"""
-    with open(filepath, 'r') as f:
-        return json.load(f)
+# Keeps each question's output together when questions run concurrently
+PRINT_LOCK = threading.Lock()
+
+NEGATIVE_PHRASES = ("not found", "cannot find", "no information", "not in the document")
+NEG_MAX_LEN = max(len(p) for p in NEGATIVE_PHRASES)
+NEG_RE = re.compile("|".join(re.escape(p) for p in NEGATIVE_PHRASES))
+
+def load_eval_set(filepath: str = EVAL_SET_PATH) -> List[Dict]:
+    """Load evaluation questions, lowercasing their expected keywords once"""
+    questions = orjson.loads(Path(filepath).read_bytes())
+    for question in questions:
+        question['expected_keywords_lower'] = tuple(k.lower() for k in question['expected_keywords'])
+    return questions
 
 def upload_test_documents() -> List[str]:
     """Upload test PDFs and return document IDs"""
@@ -25,22 +67,31 @@ def upload_test_documents() -> List[str]:
         "uploads/NDA.pdf"
     ]
     
+    # File handles are streamed into the request body instead of read up front
     files = []
-    for filepath in test_files:
-        try:
-            with open(filepath, 'rb') as f:
-                files.append(('files', (filepath.split('/')[-1], f.read(), 'application/pdf')))
-        except FileNotFoundError:
-            print(f"  Warning: {filepath} not found, skipping...")
-    
-    if not files:
-        print("No test documents found in uploads/")
-        return []
-    
-    response = requests.post(f"{API_BASE_URL}/ingest", files=files)
+    try:
+        for filepath in test_files:
+            try:
+                files.append(('files', (filepath.split('/')[-1], open(filepath, 'rb'), 'application/pdf')))
+            except FileNotFoundError:
+                print(f"  Warning: {filepath} not found, skipping...")
+        
+        if not files:
+            print("No test documents found in uploads/")
+            return []
+        
+        encoder = MultipartEncoder(fields=files)
+        response = SESSION.post(
+            f"{API_BASE_URL}/ingest",
+            data=encoder,
+            headers={"Content-Type": encoder.content_type}
+        )
+    finally:
+        for _, (_, f, _) in files:
+            f.close()
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         doc_ids = data.get('document_ids', [])
         print(f" Uploaded {len(doc_ids)} documents")
         return doc_ids
@@ -48,44 +99,133 @@ def upload_test_documents() -> List[str]:
         print(f"Upload failed: {response.status_code}")
         return []
 
-def evaluate_question(question: Dict, document_ids: List[str]) -> Dict:
+def build_keyword_index(questions: List[Dict]) -> Optional["ahocorasick.Automaton"]:
+    """Build one Aho-Corasick automaton over every question's keywords and the negative phrases"""
+    if ahocorasick is None:
+        return None
+    
+    owners = defaultdict(set)
+    for question in questions:
+        for keyword in question['expected_keywords_lower']:
+            owners[keyword].add(question['id'])
+    
+    automaton = ahocorasick.Automaton()
+    for phrase in NEGATIVE_PHRASES:
+        automaton.add_word(phrase, (True, phrase, frozenset()))
+    for keyword, question_ids in owners.items():
+        automaton.add_word(keyword, (keyword in NEGATIVE_PHRASES, keyword, frozenset(question_ids)))
+    automaton.make_automaton()
+    return automaton
+
+def match_answer(
+    answer: str,
+    question: Dict,
+    keyword_index: Optional["ahocorasick.Automaton"] = None
+) -> Tuple[set, bool]:
+    """Return the question's lowercased keywords found in an answer and whether it hedges"""
+    keywords = question['expected_keywords_lower']
+    text = answer.lower()
+    if keyword_index is None:
+        # Without pyahocorasick, plain substring checks; a per-question
+        # alternation would miss overlapping keywords
+        found = {kw for kw in keywords if kw in text}
+        return found, NEG_RE.search(text) is not None
+    
+    # Single linear scan for every keyword and negative phrase
+    remaining = set(keywords)
+    has_negative = False
+    for end, (is_negative, phrase, question_ids) in keyword_index.iter(text):
+        if is_negative:
+            has_negative = True
+        if question['id'] in question_ids:
+            remaining.discard(phrase)
+        if not remaining:
+            # All keywords found; only a hedge ending at or after this match is still unknown
+            if not has_negative:
+                has_negative = NEG_RE.search(text, max(0, end - NEG_MAX_LEN + 1)) is not None
+            break
+    return set(keywords) - remaining, has_negative
+
+class CircuitBreaker:
+    """Trips after too many consecutive API failures so the rest of the run is skipped"""
+    
+    def __init__(self, threshold: int = MAX_CONSECUTIVE_FAILURES):
+        self.threshold = threshold
+        self.consecutive_failures = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        return self.consecutive_failures >= self.threshold
+    
+    def record(self, success: bool):
+        with self._lock:
+            # Once tripped, stay open even if in-flight requests succeed
+            if self.is_open:
+                return
+            self.consecutive_failures = 0 if success else self.consecutive_failures + 1
+
+def write_output(buf: io.StringIO):
+    """Flush a question's buffered output to stdout in a single write"""
+    with PRINT_LOCK:
+        sys.stdout.write(buf.getvalue())
+
+def evaluate_question(
+    question: Dict,
+    document_ids: List[str],
+    keyword_index: Optional["ahocorasick.Automaton"] = None,
+    breaker: Optional[CircuitBreaker] = None
+) -> Dict:
     """Evaluate a single question"""
-    print(f"\n Testing Q{question['id']}: {question['question']}")
-    
+    if breaker is not None and breaker.is_open:
+        return {
+            "question_id": question['id'],
+            "score": 0.0,
+            "reason": "Skipped: too many consecutive API errors",
+            "skipped": True
+        }
     
-    response = requests.post(
-        f"{API_BASE_URL}/ask",
-        params={"question": question['question']}
-    )
+    buf = io.StringIO()
+    buf.write(f"\n Testing Q{question['id']}: {question['question']}\n")
     
-    if response.status_code != 200:
-        print(f"   API Error: {response.status_code}")
+    try:
+        response = SESSION.post(
+            f"{API_BASE_URL}/ask",
+            params={"question": question['question']},
+            timeout=ASK_TIMEOUT
+        )
+        error = None if response.status_code == 200 else response.status_code
+    except requests.exceptions.RequestException as e:
+        error = type(e).__name__
+    
+    if breaker is not None:
+        breaker.record(error is None)
+    
+    if error is not None:
+        buf.write(f"   API Error: {error}\n")
+        write_output(buf)
         return {
             "question_id": question['id'],
             "score": 0.0,
-            "reason": f"API error: {response.status_code}"
+            "reason": f"API error: {error}"
         }
     
-    data = response.json()
-    answer = data.get('answer', '').lower()
+    data = orjson.loads(response.content)
+    answer = data.get('answer', '')
     
    
     score = 0.0
-    matched_keywords = []
     
-   
-    for keyword in question['expected_keywords']:
-        if keyword.lower() in answer:
-            matched_keywords.append(keyword)
+    found, has_negative = match_answer(answer, question, keyword_index)
+    matched_keywords = [
+        kw for kw_lower, kw in zip(question['expected_keywords_lower'], question['expected_keywords'])
+        if kw_lower in found
+    ]
     
    
     if len(question['expected_keywords']) > 0:
         score = len(matched_keywords) / len(question['expected_keywords'])
     
-    
-    negative_phrases = ["not found", "cannot find", "no information", "not in the document"]
-    has_negative = any(phrase in answer for phrase in negative_phrases)
-    
     if has_negative:
         score *= 0.5  
     
@@ -98,94 +238,125 @@ def evaluate_question(question: Dict, document_ids: List[str]) -> Dict:
     
     
     status = "✅" if score >= 0.7 else "⚠️" if score >= 0.4 else "❌"
-    print(f"   {status} Score: {score:.2f}")
-    print(f"   Matched keywords: {matched_keywords}")
+    buf.write(f"   {status} Score: {score:.2f}\n")
+    buf.write(f"   Matched keywords: {matched_keywords}\n")
     if has_citations:
-        print(f"   📚 Has citations")
+        buf.write("   📚 Has citations\n")
+    write_output(buf)
     
     return {
         "question_id": question['id'],
         "question": question['question'],
-        "answer": data.get('answer', ''),
+        "answer": answer,
         "score": score,
         "matched_keywords": matched_keywords,
         "has_citations": has_citations
     }
 
+def summarize_results(results: List[Dict]) -> Dict:
+    """Aggregate scores over evaluated questions; skipped ones are counted but not scored"""
+    evaluated = [r for r in results if not r.get('skipped')]
+    scores = [r['score'] for r in evaluated]
+    passed = sum(1 for score in scores if score >= 0.7)
+    return {
+        "total_questions": len(results),
+        "evaluated_questions": len(evaluated),
+        "skipped_questions": len(results) - len(evaluated),
+        "average_score": sum(scores) / len(scores),
+        "passed": passed,
+        "pass_rate": passed / len(scores)
+    }
+
 def run_evaluation():
     """Run full evaluation"""
-    print("=" * 60)
-    print("🧪 Contract Intelligence API - Q&A Evaluation")
-    print("=" * 60)
+    try:
+        print("=" * 60)
+        print("🧪 Contract Intelligence API - Q&A Evaluation")
+        print("=" * 60)
     
    
-    try:
-        health = requests.get(f"{API_BASE_URL}/healthz", timeout=5)
-        if health.status_code != 200:
-            print("API is not healthy. Please start the API first:")
+        try:
+            health = SESSION.get(f"{API_BASE_URL}/healthz", timeout=5)
+            if health.status_code != 200:
+                print("API is not healthy. Please start the API first:")
+                print("   docker-compose up")
+                sys.exit(1)
+        except requests.exceptions.ConnectionError:
+            print("❌ Cannot connect to API. Please start it first:")
             print("   docker-compose up")
             sys.exit(1)
-    except requests.exceptions.ConnectionError:
-        print("❌ Cannot connect to API. Please start it first:")
-        print("   docker-compose up")
-        sys.exit(1)
     
     
-    doc_ids = upload_test_documents()
-    if not doc_ids:
-        print("❌ No documents uploaded. Evaluation cannot proceed.")
-        sys.exit(1)
+        doc_ids = upload_test_documents()
+        if not doc_ids:
+            print("❌ No documents uploaded. Evaluation cannot proceed.")
+            sys.exit(1)
     
     
-    eval_set = load_eval_set()
-    print(f"\n📋 Loaded {len(eval_set)} test questions\n")
+        eval_set = load_eval_set()
+        keyword_index = build_keyword_index(eval_set)
+        print(f"\n📋 Loaded {len(eval_set)} test questions\n")
     
    
-    results = []
-    for question in eval_set:
-        result = evaluate_question(question, doc_ids)
-        results.append(result)
+        # /ask is network-bound, so fan questions out over the shared session;
+        # map() keeps results in eval-set order
+        breaker = CircuitBreaker()
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(executor.map(
+                lambda q: evaluate_question(q, doc_ids, keyword_index, breaker),
+                eval_set
+            ))
+    
+        summary = summarize_results(results)
+        avg_score = summary['average_score']
+        passed = summary['passed']
+        evaluated = summary['evaluated_questions']
+        skipped = summary['skipped_questions']
+        if skipped:
+            print(f"\n⛔ Stopped after {breaker.threshold} consecutive API errors; skipped {skipped} questions")
     
+   
+        print("\n" + "=" * 60)
+        print("📊 EVALUATION SUMMARY")
+        print("=" * 60)
+        print(f"Total Questions: {len(results)}")
+        print(f"Evaluated: {evaluated} (skipped: {skipped})")
+        print(f"Average Score: {avg_score:.2f}")
+        print(f"Pass Rate (≥0.7): {passed}/{evaluated}")
     
-    avg_score = sum(r['score'] for r in results) / len(results)
     
-   
-    print("\n" + "=" * 60)
-    print("📊 EVALUATION SUMMARY")
-    print("=" * 60)
-    print(f"Total Questions: {len(results)}")
-    print(f"Average Score: {avg_score:.2f}")
-    print(f"Pass Rate (≥0.7): {sum(1 for r in results if r['score'] >= 0.7)}/{len(results)}")
-    
-    
-    if avg_score >= 0.8:
-        grade = "🌟 EXCELLENT"
-    elif avg_score >= 0.7:
-        grade = "✅ GOOD"
-    elif avg_score >= 0.5:
-        grade = "⚠️  FAIR"
-    else:
-        grade = "❌ NEEDS IMPROVEMENT"
+        if avg_score >= 0.8:
+            grade = "🌟 EXCELLENT"
+        elif avg_score >= 0.7:
+            grade = "✅ GOOD"
+        elif avg_score >= 0.5:
+            grade = "⚠️  FAIR"
+        else:
+            grade = "❌ NEEDS IMPROVEMENT"
     
-    print(f"\nOverall Grade: {grade}")
+        print(f"\nOverall Grade: {grade}")
     
     
-    with open('eval/eval_results.json', 'w') as f:
-        json.dump({
+        payload = {
             "average_score": avg_score,
-            "total_questions": len(results),
-            "pass_rate": sum(1 for r in results if r['score'] >= 0.7) / len(results),
+            "total_questions": summary['total_questions'],
+            "evaluated_questions": evaluated,
+            "skipped_questions": skipped,
+            "pass_rate": summary['pass_rate'],
             "results": results
-        }, f, indent=2)
+        }
+        Path('eval/eval_results.json').write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
     
-    print("\n💾 Detailed results saved to: eval/eval_results.json")
+        print("\n💾 Detailed results saved to: eval/eval_results.json")
     
     
-    print("\n" + "=" * 60)
-    print("📝 ONE-LINE SUMMARY (for submission):")
-    print("=" * 60)
-    print(f"Q&A Accuracy: {avg_score:.1%} ({sum(1 for r in results if r['score'] >= 0.7)}/{len(results)} passed) - {grade}")
-    print("=" * 60)
+        print("\n" + "=" * 60)
+        print("📝 ONE-LINE SUMMARY (for submission):")
+        print("=" * 60)
+        print(f"Q&A Accuracy: {avg_score:.1%} ({passed}/{evaluated} passed, {skipped} skipped) - {grade}")
+        print("=" * 60)
+    finally:
+        SESSION.close()
 
 if __name__ == "__main__":
     run_evaluation()
\ No newline at end of file
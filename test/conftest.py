@@ -1,11 +1,15 @@
 
 import pytest
 import os
+from fastapi.testclient import TestClient
 
 # Set test environment variables
 os.environ["AI_PROVIDER"] = "groq"
 os.environ["GROQ_API_KEY"] = "test_key_12345"
 
+from app.main import app
+from app.services.extraction_service import ExtractionService
+
 
 @pytest.fixture(scope="session")
 def test_config():
@@ -13,4 +17,17 @@ def test_config():
     return {
         "api_base_url": "http://localhost:8000",
         "test_pdf_path": "tests/fixtures/sample.pdf"
-    }
\ No newline at end of file
+    }
+
+
+@pytest.fixture(scope="session")
+def client():
+    """API test client shared across the session so app startup runs once"""
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def extraction_service():
+    """Extraction service shared across the session so its client is built once"""
+    return ExtractionService()
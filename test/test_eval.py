@@ -0,0 +1,144 @@
+import random
+
+import pytest
+from eval import run_eval
+from eval.run_eval import (
+    NEGATIVE_PHRASES, CircuitBreaker, build_keyword_index, evaluate_question,
+    match_answer, summarize_results
+)
+
+
+def make_question(question_id, keywords):
+    return {
+        "id": question_id,
+        "expected_keywords": keywords,
+        "expected_keywords_lower": tuple(k.lower() for k in keywords)
+    }
+
+
+QUESTIONS = [
+    # Overlapping keywords
+    make_question(1, ["renew", "Renewal", "notice"]),
+    # Keyword that is also a negative phrase
+    make_question(2, ["cancel", "not found", "date"]),
+    # Keywords ending at the same position as a negative phrase
+    make_question(3, ["found", "not"]),
+]
+
+ANSWERS = [
+    "",
+    "Renewal requires written NOTICE",
+    "renew and renewal both appear",
+    "Notice of renewal is required. Other terms not found",
+    "renew notice renewal, but no information on fees",
+    "The cancel date was NOT FOUND",
+    "Not in the document: cancel date",
+    "not found",
+    "I cannot find anything",
+]
+
+
+def baseline(answer, question):
+    """Reference result using plain substring checks"""
+    text = answer.lower()
+    found = {kw.lower() for kw in question['expected_keywords'] if kw.lower() in text}
+    return found, any(phrase in text for phrase in NEGATIVE_PHRASES)
+
+
+@pytest.fixture(scope="module")
+def keyword_index():
+    pytest.importorskip("ahocorasick")
+    return build_keyword_index(QUESTIONS)
+
+
+@pytest.mark.parametrize("question", QUESTIONS, ids=lambda q: f"q{q['id']}")
+@pytest.mark.parametrize("answer", ANSWERS)
+def test_match_answer_fallback(answer, question):
+    """Substring fallback matches the baseline"""
+    assert match_answer(answer, question) == baseline(answer, question)
+
+
+@pytest.mark.parametrize("question", QUESTIONS, ids=lambda q: f"q{q['id']}")
+@pytest.mark.parametrize("answer", ANSWERS)
+def test_match_answer_keyword_index(keyword_index, answer, question):
+    """Shared automaton, including its early exit, matches the baseline"""
+    assert match_answer(answer, question, keyword_index) == baseline(answer, question)
+
+
+def test_match_answer_keyword_index_randomized(keyword_index):
+    """Random answers built from keywords, hedges and filler match the baseline"""
+    words = ["renew", "Renewal", "NOTICE", "cancel", "date", "not", "found",
+             "NOT FOUND", "no information", "cannot find", "x"]
+    rng = random.Random(0)
+    for _ in range(2000):
+        answer = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        for question in QUESTIONS:
+            expected = baseline(answer, question)
+            assert match_answer(answer, question, keyword_index) == expected, answer
+            assert match_answer(answer, question) == expected, answer
+
+
+def test_circuit_breaker_trips_at_threshold():
+    """Breaker opens after exactly `threshold` consecutive failures"""
+    breaker = CircuitBreaker(threshold=3)
+    breaker.record(False)
+    breaker.record(False)
+    assert not breaker.is_open
+    breaker.record(False)
+    assert breaker.is_open
+
+
+def test_circuit_breaker_resets_on_success():
+    """A success before tripping resets the failure count"""
+    breaker = CircuitBreaker(threshold=3)
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(False)
+    assert not breaker.is_open
+
+
+def test_circuit_breaker_stays_open():
+    """Late successes from in-flight requests do not close a tripped breaker"""
+    breaker = CircuitBreaker(threshold=1)
+    breaker.record(False)
+    breaker.record(True)
+    assert breaker.is_open
+
+
+def test_evaluate_question_skips_when_breaker_open(monkeypatch):
+    """Open breaker skips the question without calling the API"""
+    def fail(*args, **kwargs):
+        raise AssertionError("API should not be called")
+    monkeypatch.setattr(run_eval.SESSION, "post", fail)
+    
+    breaker = CircuitBreaker(threshold=1)
+    breaker.record(False)
+    question = make_question(1, ["renew"])
+    question["question"] = "Is there a renewal clause?"
+    
+    result = evaluate_question(question, [], breaker=breaker)
+    
+    assert result["skipped"] is True
+    assert result["question_id"] == 1
+
+
+def test_summarize_results_excludes_skipped():
+    """Skipped questions are counted but left out of the average and pass rate"""
+    results = [
+        {"question_id": 1, "score": 1.0},
+        {"question_id": 2, "score": 0.5},
+        {"question_id": 3, "score": 0.0, "reason": "API error: 500"},
+        {"question_id": 4, "score": 0.0, "skipped": True},
+        {"question_id": 5, "score": 0.0, "skipped": True},
+    ]
+    
+    summary = summarize_results(results)
+    
+    assert summary["total_questions"] == 5
+    assert summary["evaluated_questions"] == 3
+    assert summary["skipped_questions"] == 2
+    assert summary["average_score"] == pytest.approx(0.5)
+    assert summary["passed"] == 1
+    assert summary["pass_rate"] == pytest.approx(1 / 3)
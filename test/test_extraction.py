@@ -1,12 +1,6 @@
 import pytest
-from app.services.extraction_service import ExtractionService
 from app.models import ExtractedFields
 
-@pytest.fixture
-def extraction_service():
-    """Fixture for extraction service"""
-    return ExtractionService()
-
 def test_extraction_basic_nda(extraction_service):
     """Test extraction from a basic NDA"""
     sample_text = """